@@ -1,5 +1,6 @@
 from biodivine_aeon import BooleanNetwork, Bdd, SymbolicContext, ColorSet
 from pathlib import Path
+import tempfile
 import zipfile
 
 # Path to the zip archive with results
@@ -10,8 +11,9 @@ bn_filename = "derived_model.aeon"
 bdd_filename = "color_bdd.bdd"
 
 with zipfile.ZipFile(zip_file_path, 'r') as archive:
-    with archive.open(bn_filename) as bn_file:
-        bn_model = BooleanNetwork.from_aeon(bn_file.read().decode('utf-8'))
+    # extract the model and let AEON read it directly (avoids decoding it in Python)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bn_model = BooleanNetwork.from_file(archive.extract(bn_filename, tmp_dir))
     with archive.open(bdd_filename) as bdd_file:
         bdd_content = bdd_file.read().decode('utf-8')
 
@@ -30,12 +32,13 @@ for var in bn_model.variables():
     var_name = bn_model.get_variable_name(var)
     update_fn = bn_model.get_update_function(var)
     params = update_fn.support_parameters()
-    color_iter = color_set.items(list(params))
+    # enumerate the candidates only once, and reuse them for both counting and printing
+    colors = list(color_set.items(list(params)))
 
     print(f"==== {var_name} ====")
     print(f"original PSBN update: {update_fn}")
-    print(f"n. of valid candidate updates: {len(list(color_iter))}")
+    print(f"n. of valid candidate updates: {len(colors)}")
 
-    for color in color_set.items(list(params)):
-        fn_instance = color.instantiate(bn_model.get_update_function(var))
+    for color in colors:
+        fn_instance = color.instantiate(update_fn)
         print(f"> {fn_instance}")
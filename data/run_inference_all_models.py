@@ -1,5 +1,8 @@
+import argparse
+import os
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # All model paths to run inference on
@@ -38,50 +41,94 @@ MODEL_PATHS = [
     "other_sketches/oscillatory_models/predator_prey/predator-prey_model_final.json",
 ]
 
-# Step 1: Compile Rust binaries
+# Directory with Rust sources, and the path to the compiled inference binary
 SOURCE_DIR = Path("../src-tauri")
-print(">>>>>>>>>> COMPILE RUST BINARIES", flush=True)
-try:
-    subprocess.run(["cargo", "build", "--release", "--bin", "run-inference"], cwd=SOURCE_DIR, check=True)
-    print("Compilation completed successfully.\n", flush=True)
-except subprocess.CalledProcessError as e:
-    print(f"Error during Rust compilation: {e}", file=sys.stderr, flush=True)
-    sys.exit(1)
-
-# Step 2: Run inference for each model and collect failures
-print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>", flush=True)
-print(">>>>>>>>>> START INFERENCE RUN", flush=True)
-print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>\n", flush=True)
-
-failures = []
-for model_path in MODEL_PATHS:
-    print("==========================", flush=True)
-    print(f"Model {model_path}", flush=True)
-    print("==========================", flush=True)
-    
-    model_path = Path(model_path)
+BINARY_NAME = "run-inference.exe" if sys.platform == "win32" else "run-inference"
+BINARY_PATH = SOURCE_DIR / "target" / "release" / BINARY_NAME
+
+# Directory where the output of each inference run is logged
+LOG_DIR = Path("inference_logs")
+
+
+def run_one(model_path: Path, log_path: Path):
+    """Run inference for a single model, streaming its output into the log file.
+    Returns the model path and the return code of the inference binary.
+    """
     model_format = model_path.suffix[1:]  # Get the file extension without the dot
-    
-    if not model_path.exists():
-        print(f"File not found: {model_path}", file=sys.stderr, flush=True)
-        continue
-    
+    with open(log_path, 'wb') as log_file:
+        result = subprocess.run(
+            [str(BINARY_PATH), str(model_path), "--input-format", model_format],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+    return model_path, result.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of models processed in parallel")
+    args = parser.parse_args()
+
+    # Step 1: Compile Rust binaries
+    print(">>>>>>>>>> COMPILE RUST BINARIES", flush=True)
     try:
-        subprocess.run([str(SOURCE_DIR / "target/release/run-inference.exe"), str(model_path), "--input-format", model_format], check=True)
-    except FileNotFoundError:
-        print(f"Executable not found: {SOURCE_DIR / 'target/release/run-inference.exe'}", file=sys.stderr, flush=True)
+        subprocess.run(["cargo", "build", "--release", "--bin", "run-inference"], cwd=SOURCE_DIR, check=True)
+        print("Compilation completed successfully.\n", flush=True)
     except subprocess.CalledProcessError as e:
-        failures.append(model_path)
-        print(f"Error running inference for {model_path}: {e}", file=sys.stderr, flush=True)
-
-# Step 3: Print summary of failures or success
-if failures:
-    print("\n\n==========================", flush=True)
-    print("INFERENCE FAILED FOR THE FOLLOWING MODELS:", flush=True)
-    for failure in failures:
-        print(failure, flush=True)
-    print("==========================\n", flush=True)
-else:
-    print("\n\n==========================", flush=True)
-    print("ALL COMPUTATIONS COMPLETED SUCCESSFULLY", flush=True)
-    print("==========================\n", flush=True)
\ No newline at end of file
+        print(f"Error during Rust compilation: {e}", file=sys.stderr, flush=True)
+        sys.exit(1)
+
+    if not BINARY_PATH.exists():
+        print(f"Executable not found: {BINARY_PATH}", file=sys.stderr, flush=True)
+        sys.exit(1)
+
+    # Step 2: Run inference for all models in parallel, each logging into its own file
+    print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>", flush=True)
+    print(">>>>>>>>>> START INFERENCE RUN", flush=True)
+    print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>\n", flush=True)
+
+    LOG_DIR.mkdir(exist_ok=True)
+    log_paths = {}
+    for model_path in map(Path, MODEL_PATHS):
+        if not model_path.exists():
+            print(f"File not found: {model_path}", file=sys.stderr, flush=True)
+            continue
+        log_paths[model_path] = LOG_DIR / f"{'_'.join(model_path.parts)}.log"
+
+    failures = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run_one, path, log): path for path, log in log_paths.items()}
+        for future in as_completed(futures):
+            model_path = futures[future]
+            try:
+                _, returncode = future.result()
+            except OSError as e:
+                failures.append(model_path)
+                print(f"Error running inference for {model_path}: {e}", file=sys.stderr, flush=True)
+                continue
+            if returncode != 0:
+                failures.append(model_path)
+                print(f"Error running inference for {model_path}: exit code {returncode}", file=sys.stderr, flush=True)
+
+    # Print the logged outputs in the original model order
+    for model_path, log_path in log_paths.items():
+        print("==========================", flush=True)
+        print(f"Model {model_path.as_posix()}", flush=True)
+        print("==========================", flush=True)
+        print(log_path.read_text(encoding='utf-8', errors='replace'), end="", flush=True)
+
+    # Step 3: Print summary of failures or success
+    if failures:
+        print("\n\n==========================", flush=True)
+        print("INFERENCE FAILED FOR THE FOLLOWING MODELS:", flush=True)
+        for failure in [path for path in log_paths if path in failures]:
+            print(failure, flush=True)
+        print("==========================\n", flush=True)
+    else:
+        print("\n\n==========================", flush=True)
+        print("ALL COMPUTATIONS COMPLETED SUCCESSFULLY", flush=True)
+        print("==========================\n", flush=True)
+
+
+if __name__ == "__main__":
+    main()
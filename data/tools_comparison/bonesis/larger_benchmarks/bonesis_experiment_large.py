@@ -40,11 +40,10 @@ def main():
 
     # Create and configure the solver with fixed-point observations
     solver = bo.BoNesis(dom, data)
-    all_fixed_points = set()
-    for obs_id in data:
-        solver.fixed(solver.obs(obs_id))
-        all_fixed_points.add(solver.obs(obs_id))
-    solver.all_fixpoints(all_fixed_points)
+    observations = {obs_id: solver.obs(obs_id) for obs_id in data}
+    for observation in observations.values():
+        solver.fixed(observation)
+    solver.all_fixpoints(set(observations.values()))
     print(f"Time to process inputs: {(time.time() - init_time) * 1e3:.0f}ms")
 
     # Run the inference
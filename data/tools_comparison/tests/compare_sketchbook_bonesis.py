@@ -2,49 +2,65 @@ import argparse
 import bonesis.aeon
 import os
 import csv
+import tempfile
 import zipfile
 
-from biodivine_aeon import BooleanNetwork, Bdd, SymbolicContext, ColorSet, BddVariableSet
+from biodivine_aeon import BooleanNetwork, Bdd, SymbolicContext, ColorSet
 from mpbn import MPBooleanNetwork
 from pathlib import Path
 
 
-class CanonicalBN:
-    """Simple canonical representation of a Boolean network using BDDs.
-    
+class ColorEncoder:
+    """Symbolic encoding of concrete Boolean networks as colors of Sketchbook results.
+
+    A color is an interpretation of the uninterpreted functions of the Sketchbook model,
+    and it uniquely determines a concrete network. A network is therefore encoded as a
+    BDD that is either a singleton color, or empty (when the network cannot be obtained
+    by instantiating the model).
+
     Args:
-        update_functions: Mapping of variable name -> update fn expression
-        bdd_vars: A set of BDD variables, the names must correspond to the network
-            variables and must be the same for all compared BNs.
+        model: The Sketchbook model (update functions use uninterpreted functions)
+        context: Symbolic context of the model, shared with the Sketchbook color set.
 
     Params:
-        bdds: Mapping of variable name -> update fn BDD
+        update_bdds: Mapping of variable name -> update fn BDD (over states and colors)
+        cache: Mapping of variable name -> update fn expression -> BDD of colors
     """
-    def __init__(self, update_functions: dict[str, str], bdd_vars: BddVariableSet):
-        self.bdds: dict[str, Bdd] = {}
-        for var, func_str in sorted(update_functions.items()):
-            self.bdds[var] = bdd_vars.eval_expression(func_str)
-        
-    def __hash__(self):
-        """Hash based on canonical function representation."""
-        # Convert BDDs to their string representation for hashing
-        bdd_strings = tuple(sorted((var, str(bdd)) for var, bdd in self.bdds.items()))
-        return hash(bdd_strings)
-    
-    def __eq__(self, other):
-        """Semantic equality: same variables and BDD-equivalent update functions."""
-        if not isinstance(other, CanonicalBN):
-            return False
-        if self.bdds.keys() != self.bdds.keys():
-            return False
-        for var in self.bdds.keys():
-            if self.bdds[var] != other.bdds[var]:
-                return False
-        return True
-    
-    def __repr__(self):
-        return f"CanonicalBN({list(self.bdds.keys())})"
-    
+    def __init__(self, model: BooleanNetwork, context: SymbolicContext):
+        self.context = context
+        self.state_variables = context.network_bdd_variables()
+        self.update_bdds: dict[str, Bdd] = {}
+        for var in model.variables():
+            update_fn = model.get_update_function(var)
+            self.update_bdds[model.get_variable_name(var)] = context.mk_update_function(update_fn)
+        self.cache: dict[str, dict[str, Bdd]] = {var: {} for var in self.update_bdds}
+
+    def update_colors(self, var: str, func_str: str) -> Bdd:
+        """Compute colors for which the update of `var` is equivalent to the expression.
+
+        The same update expressions recur across many candidate networks, so the
+        results are cached.
+        """
+        var_cache = self.cache[var]
+        colors = var_cache.get(func_str)
+        if colors is None:
+            func_bdd = self.context.bdd_variable_set().eval_expression(func_str)
+            # the functions must agree in all states
+            colors = self.update_bdds[var].l_iff(func_bdd).r_for_all(self.state_variables)
+            var_cache[func_str] = colors
+        return colors
+
+    def encode(self, update_functions: dict[str, str]) -> Bdd:
+        """Encode a network given by a mapping of variable name -> update fn expression."""
+        colors = self.context.mk_constant(True)
+        for var, func_str in update_functions.items():
+            colors = colors.l_and(self.update_colors(var, func_str))
+        return colors
+
+
+# Translation of (non-empty) specification CSV cells to Boolean values
+_SPEC_VALUES = {"1": True, "0": False}
+
 
 def parse_observations_csv(csv_path):
     """Parse observations from a specification CSV into a dict.
@@ -79,26 +95,40 @@ def parse_observations_csv(csv_path):
                 continue
 
             obs_id = row[0].strip()
-            values = {}
-            for var, cell in zip(vars, row[1:]):
-                cell = cell.strip()
-                if cell == "":
-                    continue  # unspecified
-                elif cell == "1":
-                    values[var] = True
-                elif cell == "0":
-                    values[var] = False
-                else:
-                    # Throw error on any other than binary value
-                    raise ValueError(f"Unsupported specification value `{cell}`.")
+            cells = [(var, cell.strip()) for var, cell in zip(vars, row[1:])]
+            try:
+                # skip empty cells (unspecified values)
+                values = {var: _SPEC_VALUES[cell] for var, cell in cells if cell}
+            except KeyError as e:
+                # Throw error on any other than binary value
+                raise ValueError(f"Unsupported specification value `{e.args[0]}`.") from None
             spec[obs_id] = values
     if len(spec) == 0:
         raise ValueError(f"Specification file has no observations.")
     return spec
 
 
-def main(sketchbook_zip_path: str, bonesis_psbn_path: str, bonesis_data_path: str,
-         universal_fps: bool):
+def get_bonesis_expression_map(bn: MPBooleanNetwork):
+    """Create `variable -> update_expression` mapping from a `MPBooleanNetwork`."""
+    # `MPBooleanNetwork` is a dict of variable -> expression, so we can avoid
+    # serializing the whole network and parsing it back
+    dictt = {}
+    for (var, expr) in bn.items():
+        if expr is bn.ba.TRUE:
+            dictt[var] = "true"
+        elif expr is bn.ba.FALSE:
+            dictt[var] = "false"
+        else:
+            dictt[var] = str(expr)
+    return dictt
+
+
+def compare(sketchbook_zip_path: str, bonesis_psbn_path: str, bonesis_data_path: str,
+            universal_fps: bool) -> bool:
+    """Compare the Sketchbook results with networks inferred by BoNesis (on the same
+    model and data), printing the progress and a summary. Returns True if the results
+    match exactly.
+    """
     # ============ Load Sketchbook results from a zip ============
     zip_file_path = Path(sketchbook_zip_path)
     bn_filename = "derived_model.aeon"
@@ -106,24 +136,18 @@ def main(sketchbook_zip_path: str, bonesis_psbn_path: str, bonesis_data_path: st
 
     print(f"Processing Sketchbook results...")
     with zipfile.ZipFile(zip_file_path, 'r') as archive:
-        with archive.open(bn_filename) as bn_file:
-            sketchbook_model = BooleanNetwork.from_aeon(bn_file.read().decode('utf-8'))
+        # extract the model and let AEON read it directly (avoids decoding it in Python)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sketchbook_model = BooleanNetwork.from_file(archive.extract(bn_filename, tmp_dir))
         with archive.open(bdd_filename) as bdd_file:
             bdd_content = bdd_file.read().decode('utf-8')
 
     context = SymbolicContext(sketchbook_model)
-    bdd_variables = BddVariableSet(context.network_variable_names())
     loaded_bdd = Bdd(context.bdd_variable_set(), bdd_content)
     color_set = ColorSet(context, loaded_bdd)
     print(f"Loaded raw Sketchbook results from zip: {color_set}")
-
-    # Extract all Sketchbook candidate networks as BooleanNetwork objects
-    sketchbook_networks: list[BooleanNetwork] = []
-    for color in color_set.items():
-        # color.instantiate() gives the full concrete network
-        network = color.instantiate(sketchbook_model)
-        sketchbook_networks.append(network)
-    print(f"Extracted {len(sketchbook_networks)} Sketchbook candidate networks.\n")
+    # Sketchbook candidates are kept symbolic, there is no need to enumerate them
+    print(f"Extracted {color_set.cardinality()} Sketchbook candidate networks.\n")
 
     # ================================================
     # ============= Load Bonesis results =============
@@ -135,49 +159,45 @@ def main(sketchbook_zip_path: str, bonesis_psbn_path: str, bonesis_data_path: st
 
     # create the solver and add all fixed-point constraints
     bo_solver = bonesis.BoNesis(dom, data)
-    for obs_id in data.keys():
-        bo_solver.fixed(~bo_solver.obs(obs_id))
+    observations = {obs_id: bo_solver.obs(obs_id) for obs_id in data.keys()}
+    for observation in observations.values():
+        bo_solver.fixed(~observation)
     if universal_fps:
         # enforce that no additional fixed points are possible
-        bo_solver.all_fixpoints({bo_solver.obs(obs) for obs in data.keys()});
-
-    # run inference and collect the networks
-    bonesis_networks: list[MPBooleanNetwork] = list(bo_solver.boolean_networks(limit=1000000))
-    print(f"Extracted {len(bonesis_networks)} BoNesis candidate networks.\n")
+        bo_solver.all_fixpoints(set(observations.values()))
+
+    # run inference and collect the networks symbolically, encoded as Sketchbook colors
+    # (networks that cannot be encoded are only counted, they can't be Sketchbook results)
+    encoder = ColorEncoder(sketchbook_model, context)
+    bonesis_colors = context.mk_constant(False)
+    bonesis_count = 0
+    not_encodable_count = 0
+    for network in bo_solver.boolean_networks(limit=1000000):
+        network_color = encoder.encode(get_bonesis_expression_map(network))
+        if network_color.is_false():
+            not_encodable_count += 1
+        bonesis_colors = bonesis_colors.l_or(network_color)
+        bonesis_count += 1
+    bonesis_color_set = ColorSet(context, bonesis_colors)
+    print(f"Extracted {bonesis_count} BoNesis candidate networks.\n")
 
     # ===============================================
     # =============== Compare results ===============
-    def get_sketchbook_expression_map(bn: BooleanNetwork):
-        """Create `variable-> update_expression` mapping from a `BooleanNetwork`."""
-        dictt = {variable: bn.get_update_function(variable).as_expression() for variable in bn.variable_names()}
-        return dictt
-
-    def get_bonesis_expression_map(bn: MPBooleanNetwork):
-        """Create `variable -> update_expression` mapping from a `MPBooleanNetwork`."""
-        dictt = {line.split(',')[0].strip(): line.split(',')[1].strip() for line in bn.source().strip().split('\n')}
-        for (key, val) in dictt.items():
-            if val == "1":
-                dictt[key] = "true"
-            if val == "0":
-                dictt[key] = "false"
-        return dictt
-
     print(f"Comparing the results...")
-    sketchbook_canonic_bns = {CanonicalBN(get_sketchbook_expression_map(net), bdd_variables) for net in sketchbook_networks}
-    bonesis_canonic_bns = {CanonicalBN(get_bonesis_expression_map(net), bdd_variables) for net in bonesis_networks}
-
-    only_in_sketchbook = sketchbook_canonic_bns - bonesis_canonic_bns
-    only_in_bonesis = bonesis_canonic_bns - sketchbook_canonic_bns
-    in_both = sketchbook_canonic_bns & bonesis_canonic_bns
+    in_both = color_set.intersect(bonesis_color_set).cardinality()
+    only_in_sketchbook = color_set.minus(bonesis_color_set).cardinality()
+    only_in_bonesis = bonesis_color_set.minus(color_set).cardinality() + not_encodable_count
 
-    print(f"Networks in both: {len(in_both)}")
-    print(f"Networks only in Sketchbook: {len(only_in_sketchbook)}")
-    print(f"Networks only in Bonesis: {len(only_in_bonesis)}\n")
+    print(f"Networks in both: {in_both}")
+    print(f"Networks only in Sketchbook: {only_in_sketchbook}")
+    print(f"Networks only in Bonesis: {only_in_bonesis}\n")
 
-    if len(only_in_sketchbook) == 0 and len(only_in_bonesis) == 0:
+    results_match = only_in_sketchbook == 0 and only_in_bonesis == 0
+    if results_match:
         print("Results match exactly!")
     else:
         print("Results differ!")
+    return results_match
 
 
 if __name__ == "__main__":
@@ -189,4 +209,4 @@ if __name__ == "__main__":
                         action="store_true")
     args = parser.parse_args()
 
-    main(args.sketchbook_zip, args.psbn_aeon, args.data_csv, args.universal_fps)
+    compare(args.sketchbook_zip, args.psbn_aeon, args.data_csv, args.universal_fps)
@@ -4,6 +4,9 @@ import random
 
 from biodivine_aeon import AsynchronousGraph, BooleanNetwork, FixedPoints, VertexModel
 
+# Maximal number of fixed points exported into the dataset
+MAX_FIXED_POINTS = 10
+
 
 def compute_fixed_point_data(psbn_path: str, csv_out_path: str):
     """Compute fixed points of the given BN, output (max 10) fixed-point states
@@ -13,8 +16,10 @@ def compute_fixed_point_data(psbn_path: str, csv_out_path: str):
     bn = BooleanNetwork.from_file(psbn_path, repair_graph=True)
 
     # Make sure all inputs are using self-loop to get a single BN instance
+    # (predecessors are collected beforehand, adding a self-loop only affects the input itself)
+    predecessors = {bn_var: bn.predecessors(bn_var) for bn_var in bn.variables()}
     for bn_var in bn.variables():
-        if not bn.predecessors(bn_var):
+        if not predecessors[bn_var]:
             var_name = bn.get_variable_name(bn_var)
             bn.add_regulation(f"{str(var_name)} -> {str(var_name)}")
             bn.set_update_function(bn_var, str(var_name))
@@ -30,15 +35,24 @@ def compute_fixed_point_data(psbn_path: str, csv_out_path: str):
         print("NO FIXED POINTS")
         return
 
+    # If there are more than 10, randomly select 10 fixed points
+    if fixed_points.cardinality() <= MAX_FIXED_POINTS:
+        selected_fixed_points = list(fixed_points)
+    else:
+        # Sample uniformly from the symbolic set, so that we don't need to enumerate all
+        # fixed points (duplicate samples are skipped, giving a sample without replacement)
+        sampled = {}
+        for fp in fixed_points.sample_items(seed=random.getrandbits(64)):
+            sampled.setdefault(tuple(fp.values()), fp)
+            if len(sampled) == MAX_FIXED_POINTS:
+                break
+        selected_fixed_points = list(sampled.values())
+
     collected_fixed_points = []
-    for fp in fixed_points:
+    for fp in selected_fixed_points:
         fp_renamed = {bn.get_variable_name(variable): update for variable, update in fp.items()}
         collected_fixed_points.append(fp_renamed)
-    
-    # If there are more than 10, randomly select 10 fixed points
-    if len(collected_fixed_points) > 10:
-        collected_fixed_points = random.sample(collected_fixed_points, 10)
-    
+
     export_fps(csv_out_path, collected_fixed_points)
 
 
@@ -46,15 +60,15 @@ def export_fps(csv_out_path: str, fixed_points: list[VertexModel]):
     """Export fixed-point states into a CSV."""
     with open(csv_out_path, 'w', newline='') as f:
         # Get variable names from first fixed point, sorted alphabetically
-        fieldnames = ['ID'] + sorted(fixed_points[0].keys())
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for i, fp in enumerate(fixed_points, 1):
-            row = {'ID': f'Observation{i}'}
-            # Convert bool strings to 0/1
-            row.update({k: 1 if v else 0 for k, v in fp.items()})
-            writer.writerow(row)
+        var_names = sorted(fixed_points[0].keys())
+        writer = csv.writer(f)
+
+        writer.writerow(['ID'] + var_names)
+        # Write plain rows in the column order (bools converted to 0/1)
+        writer.writerows(
+            [f'Observation{i}'] + [int(fp[var]) for var in var_names]
+            for i, fp in enumerate(fixed_points, 1)
+        )
 
 
 if __name__ == "__main__":
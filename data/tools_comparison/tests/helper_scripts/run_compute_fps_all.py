@@ -1,10 +1,31 @@
 import argparse
+import os
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-def run_fps_for_all_models(models_dir: str):
-    """Run get_fps_data.py for all .aeon files in models_dir."""
+# Number of characters of the script's stderr that are printed on failure
+OUTPUT_PREVIEW_LEN = 200
+
+
+def run_fps(aeon_file: Path, csv_out: Path):
+    """Run get_fps_data.py on a single model, computing the model's fixed points.
+    Returns the exit code of the script (None if the computation timed out) and its stderr.
+    """
+    # The script's standard output is not used, so it is discarded (instead of being buffered)
+    cmd = [sys.executable, "get_fps_data.py", str(aeon_file), str(csv_out)]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=300)
+    except subprocess.TimeoutExpired:
+        return None, ""
+    return result.returncode, result.stderr
+
+
+def run_fps_for_all_models(models_dir: str, max_workers: int | None = None):
+    """Run get_fps_data.py for all .aeon files in models_dir. Up to `max_workers`
+    models are processed in parallel (by default, one per CPU).
+    """
     models_path = Path(models_dir)
     if not models_path.exists():
         print(f"Error: Directory {models_dir} does not exist")
@@ -17,17 +38,28 @@ def run_fps_for_all_models(models_dir: str):
         sys.exit(1)
     print(f"Found {len(aeon_files)} models\n")
     
-    for idx, aeon_file in enumerate(aeon_files, 1):
-        csv_out = aeon_file.with_name(aeon_file.stem + ".csv")
-        print(f"[{idx}/{len(aeon_files)}] Processing {aeon_file.name}")
-        print(f"  Output: {csv_out.name}")
-        
-        # Run get_fps_data.py, computing the model's fixed points
-        cmd = [sys.executable, "get_fps_data.py", str(aeon_file), str(csv_out)]
-        subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for idx, aeon_file in enumerate(aeon_files, 1):
+            csv_out = aeon_file.with_name(aeon_file.stem + ".csv")
+            futures[executor.submit(run_fps, aeon_file, csv_out)] = (idx, aeon_file, csv_out)
+
+        for future in as_completed(futures):
+            idx, aeon_file, csv_out = futures[future]
+            print(f"[{idx}/{len(aeon_files)}] Processing {aeon_file.name}")
+            print(f"  Output: {csv_out.name}")
+            returncode, stderr = future.result()
+            if returncode is None:
+                print(f"  X Timeout (300s)")
+            elif returncode != 0:
+                print(f"  X Failed (exit code {returncode})")
+                if stderr:
+                    print(f"  stderr: {stderr[-OUTPUT_PREVIEW_LEN:]}")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("models_dir", help="Directory containing .aeon model files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of models processed in parallel")
     args = parser.parse_args()
-    run_fps_for_all_models(args.models_dir)
\ No newline at end of file
+    run_fps_for_all_models(args.models_dir, args.workers)
\ No newline at end of file
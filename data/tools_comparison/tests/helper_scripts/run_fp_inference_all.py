@@ -1,9 +1,19 @@
+import os
 import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-def run_inference_for_all_models(models_dir: str, rust_binary: str, output_dir: str):
-    """Run fixed-point-inference Sketchbook binary for all .aeon files in models_dir."""
+# Number of characters of the binary's stdout/stderr that are printed
+OUTPUT_PREVIEW_LEN = 200
+
+
+def run_inference_for_all_models(models_dir: str, rust_binary: str, output_dir: str,
+                                 max_workers: int | None = None):
+    """Run fixed-point-inference Sketchbook binary for all .aeon files in models_dir.
+    Up to `max_workers` models are processed in parallel (by default, one per CPU).
+    """
     models_path = Path(models_dir)
     binary_path = Path(rust_binary)
     output_path = Path(output_dir)
@@ -25,44 +35,72 @@ def run_inference_for_all_models(models_dir: str, rust_binary: str, output_dir:
         sys.exit(1)
     print(f"Found {len(aeon_files)} models\n")
     
+    # Prepare inputs and outputs for all models
+    tasks = []
     for idx, aeon_file in enumerate(aeon_files, 1):
         # Find corresponding CSV file
         csv_file = aeon_file.with_suffix(".csv")
         if not csv_file.exists():
             print(f"[{idx}/{len(aeon_files)}] Skipping {aeon_file.name} (no CSV found)")
             continue
-        
         # Prepare output file name
         output_zip = output_path / aeon_file.with_suffix(".zip").name
-        print(f"[{idx}/{len(aeon_files)}] Processing {aeon_file.name}")
-        print(f"  CSV: {csv_file.name}")
-        print(f"  Output: {output_zip.name}")
-        
-        # Prepare command and arguments
-        cmd = [
-            str(binary_path),
-            str(aeon_file),
-            str(csv_file),
-            str(output_zip)
+        tasks.append((idx, aeon_file, csv_file, output_zip))
+
+    # Run the inference for all models in parallel, printing the logs once each run finishes
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_inference, binary_path, aeon_file, csv_file, output_zip)
+            for (_, aeon_file, csv_file, output_zip) in tasks
         ]
-        
-        try:
+        task_of_future = dict(zip(futures, tasks))
+        for future in as_completed(futures):
+            idx, aeon_file, csv_file, output_zip = task_of_future[future]
+            print(f"[{idx}/{len(aeon_files)}] Processing {aeon_file.name}")
+            print(f"  CSV: {csv_file.name}")
+            print(f"  Output: {output_zip.name}")
+            for line in future.result():
+                print(line)
+            print()
+
+
+def run_inference(binary_path: Path, aeon_file: Path, csv_file: Path, output_zip: Path):
+    """Run the inference binary on a single model, and return the lines to log.
+
+    The output of the binary is streamed into temporary files, and only a short
+    preview of it is read back (instead of buffering all of it in memory).
+    """
+    # Prepare command and arguments
+    cmd = [
+        str(binary_path),
+        str(aeon_file),
+        str(csv_file),
+        str(output_zip)
+    ]
+
+    log_lines = []
+    try:
+        with tempfile.TemporaryFile('w+') as stdout, tempfile.TemporaryFile('w+') as stderr:
             # Finally run the Sketchbook inference binary (with 10min time limit)
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-            if result.stdout:
-                print(f"  stdout: {result.stdout[:200]}")
-            if result.stderr:
-                print(f"  stderr: {result.stderr[:200]}")
-            if result.returncode == 0:
-                print(f"  -> Success")
-            else:
-                print(f"  X Failed (exit code {result.returncode})")
-        except subprocess.TimeoutExpired:
-            print(f"  X Timeout (600s)")
-        except Exception as e:
-            print(f"  X Error: {e}")
-        
-        print()
+            result = subprocess.run(cmd, stdout=stdout, stderr=stderr, timeout=600)
+            stdout.seek(0)
+            stderr.seek(0)
+            stdout_preview = stdout.read(OUTPUT_PREVIEW_LEN)
+            stderr_preview = stderr.read(OUTPUT_PREVIEW_LEN)
+        if stdout_preview:
+            log_lines.append(f"  stdout: {stdout_preview}")
+        if stderr_preview:
+            log_lines.append(f"  stderr: {stderr_preview}")
+        if result.returncode == 0:
+            log_lines.append(f"  -> Success")
+        else:
+            log_lines.append(f"  X Failed (exit code {result.returncode})")
+    except subprocess.TimeoutExpired:
+        log_lines.append(f"  X Timeout (600s)")
+    except Exception as e:
+        log_lines.append(f"  X Error: {e}")
+    return log_lines
+
 
 if __name__ == "__main__":
     import argparse
@@ -70,6 +108,7 @@ if __name__ == "__main__":
     parser.add_argument("models_dir", help="Directory containing .aeon and .csv model files")
     parser.add_argument("rust_binary", help="Path to run-fixed-point-inference binary")
     parser.add_argument("--output-dir", default="./inference_results", help="Output directory for results")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of models processed in parallel")
     args = parser.parse_args()
 
-    run_inference_for_all_models(args.models_dir, args.rust_binary, args.output_dir)
\ No newline at end of file
+    run_inference_for_all_models(args.models_dir, args.rust_binary, args.output_dir, args.workers)
\ No newline at end of file
@@ -14,15 +14,17 @@ def loosen_model(psbn_in_path: Path, psbn_out_path: Path,
     """
     bn = BooleanNetwork.from_file(str(psbn_in_path), repair_graph=True)
 
+    # Collect the regulators of all variables in a single pass
+    predecessors = {bn_var: bn.predecessors(bn_var) for bn_var in bn.variables()}
+
     num_fn_symbols_added = 0
     for bn_var in bn.variables():
         # Make the function unspecified
-        if num_fn_symbols_added < num_fn_symbols and len(bn.predecessors(bn_var)) < max_arity:
+        if num_fn_symbols_added < num_fn_symbols and len(predecessors[bn_var]) < max_arity:
             bn.set_update_function(bn_var, None)
             num_fn_symbols_added += 1
-        # Or make sure the function expressions are simplified, e.g., (A | !B) instead of (A | (!A & !B))
-        # since BoNesis seems to struggle with these
-        bn.get_update_function(bn_var)
+    # Note that the remaining function expressions are simplified (e.g., (A | !B) instead of
+    # (A | (!A & !B)), which BoNesis struggles with) separately by `run_simplify_all.py`
 
     # Rewrite the original model with new loosened BN
     updated_bn_str = bn.to_aeon()
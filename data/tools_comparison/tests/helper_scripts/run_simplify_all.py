@@ -1,89 +1,385 @@
-import glob
+import argparse
+import functools
+import hashlib
+import multiprocessing.util
 import os
+import re
+import shutil
+import sqlite3
 import sys
-from sympy.logic.boolalg import simplify_logic
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pyeda.boolalg.expr import AndOp, OrOp
+from pyeda.inter import espresso_exprs, expr as pyeda_expr
+from sympy import And, Not, Or, Symbol
+from sympy.logic.boolalg import BooleanFalse, BooleanTrue, simplify_logic
 from sympy.parsing.sympy_parser import parse_expr
 
+# Update function line `$var: expression` (surrounding whitespace is not captured)
+_UPDATE_RE = re.compile(r'^\s*(\$[^:]*):\s*(.*?)\s*$')
 
+# AEON Boolean constants (PyEDA uses 1 and 0 instead)
+_CONSTANTS_RE = re.compile(r'\b(true|false)\b')
+
+# Tokens of AEON expressions handled by the simple minimizer (identifiers and single characters)
+_TOKEN_RE = re.compile(r'\s*(?:([A-Za-z_]\w*)|(\S))')
+
+# Uninterpreted function applications (with variables as arguments), and variable names
+_APPLICATION_RE = re.compile(r'\b([A-Za-z_]\w*)\s*\(([^()]*)\)')
+_VARIABLE_RE = re.compile(r'\b[A-Za-z_]\w*\b')
+
+# SymPy symbols for all identifiers seen so far (reused across parsed expressions). SymPy can't
+# handle uninterpreted functions in boolean expressions, so each function application is replaced
+# by a placeholder identifier, mapped to a symbol named by the (normalized) application.
+_symbol_cache: dict[str, Symbol] = {}
+_application_placeholders: dict[str, str] = {}
+
+# Simplified expressions are also cached on disk, so they are reused across runs. The version
+# is part of the cache keys, and must be changed whenever the simplification output changes.
+DISK_CACHE_PATH = ".simplify_cache.db"
+DISK_CACHE_VERSION = "4"
+
+# Connection to the disk cache (opened separately in each worker process)
+_disk_cache = None
+
+
+def open_disk_cache(path):
+    """Open (and create if needed) the SQLite disk cache of simplified expressions."""
+    global _disk_cache
+    # Multiple worker processes share the cache; WAL mode lets them read while one writes
+    _disk_cache = sqlite3.connect(path, timeout=60)
+    _disk_cache.execute("PRAGMA journal_mode=WAL")
+    _disk_cache.execute("PRAGMA synchronous=NORMAL")  # It is only a cache, durability is not critical
+    _disk_cache.execute("CREATE TABLE IF NOT EXISTS simplified (hash TEXT PRIMARY KEY, expression TEXT)")
+    # Close the connection when the worker exits (pool workers don't run `atexit` handlers);
+    # closing the last connection checkpoints the WAL into the database and removes it
+    multiprocessing.util.Finalize(None, _disk_cache.close, exitpriority=10)
+
+
+def _pyeda_to_aeon(dnf):
+    """Translate a PyEDA DNF expression to AEON format. Literals and terms are sorted
+    (positive literals first, like in `sympy`), so that the output does not depend on
+    the order in which PyEDA created its variables."""
+    def literals(term):
+        return sorted((str(lit).replace('~', '!') for lit in term.xs), key=lambda l: (l.startswith('!'), l))
+
+    if isinstance(dnf, OrOp):
+        terms = [literals(t) if isinstance(t, AndOp) else [str(t).replace('~', '!')] for t in dnf.xs]
+        return " | ".join(
+            f"({' & '.join(t)})" if len(t) > 1 else t[0] for t in sorted(terms)
+        )
+    if isinstance(dnf, AndOp):
+        return " & ".join(literals(dnf))
+    return str(dnf).replace('~', '!')
+
+
+def _parse_aeon(expr_str):
+    """
+    Parse the AEON boolean string (with operators `!`, `&`, `|` and parentheses) into a
+    tree of tuples `("const", bool)`, `("var", name)`, `("not", node)`, `("and", [nodes])`
+    and `("or", [nodes])`. Raises ValueError for other expressions.
+    """
+    tokens = [name or symbol for name, symbol in _TOKEN_RE.findall(expr_str)]
+    pos = 0
+
+    def parse_binary(operator, parse_operand):
+        nonlocal pos
+        operands = [parse_operand()]
+        while pos < len(tokens) and tokens[pos] == operator:
+            pos += 1
+            operands.append(parse_operand())
+        return operands[0] if len(operands) == 1 else ("and" if operator == "&" else "or", operands)
+
+    def parse_or():
+        return parse_binary("|", parse_and)
+
+    def parse_and():
+        return parse_binary("&", parse_atom)
+
+    def parse_atom():
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError("Unexpected end of expression")
+        token = tokens[pos]
+        pos += 1
+        if token == "!":
+            return "not", parse_atom()
+        if token == "(":
+            node = parse_or()
+            if pos >= len(tokens) or tokens[pos] != ")":
+                raise ValueError("Missing closing parenthesis")
+            pos += 1
+            return node
+        if token in ("true", "false"):
+            return "const", token == "true"
+        if token[0].isalpha() or token[0] == "_":
+            return "var", token
+        raise ValueError(f"Unsupported token `{token}`")
+
+    node = parse_or()
+    if pos != len(tokens):
+        raise ValueError(f"Unsupported token `{tokens[pos]}`")
+    return node
+
+
+def _to_cube(node, negated=False):
+    """
+    Reduce the (possibly negated) expression tree to a constant (bool) or a conjunction of
+    literals (frozenset of `(negated, name)` pairs), using double negation elimination,
+    De Morgan's laws, constant folding, idempotence and absorption. Returns None if the
+    expression can't be reduced this way.
+    """
+    kind, value = node
+    if kind == "const":
+        return value != negated
+    if kind == "var":
+        return frozenset({(negated, value)})
+    if kind == "not":
+        return _to_cube(value, not negated)
+
+    operands = [_to_cube(operand, negated) for operand in value]
+    if None in operands:
+        return None
+    if (kind == "and") != negated:
+        # Conjunction: fold constants and merge the literals
+        if False in operands:
+            return False
+        literals = frozenset().union(*(op for op in operands if op is not True))
+        if any((not neg, name) in literals for neg, name in literals):
+            return False
+        return literals or True
+    # Disjunction: fold constants, and absorb all operands into the smallest one (if possible)
+    if True in operands:
+        return True
+    cubes = [op for op in operands if op is not False]
+    if not cubes:
+        return False
+    smallest = min(cubes, key=len)
+    if all(smallest <= cube for cube in cubes):
+        return smallest
+    return None
+
+
+def simplify_with_ast(expr_str):
+    """
+    Simplify the (stripped) AEON boolean string with a small rule-based minimizer, if it
+    reduces to a constant or a conjunction of literals (for which this is the minimal DNF,
+    formatted the same way as the `pyeda` output). Returns None for other expressions.
+    """
+    try:
+        cube = _to_cube(_parse_aeon(expr_str))
+    except ValueError:
+        return None
+    if cube is None:
+        return None
+    if isinstance(cube, bool):
+        return "true" if cube else "false"
+    return " & ".join(f"!{name}" if negated else name for negated, name in sorted(cube))
+
+
+def simplify_with_espresso(expr_str):
+    """
+    Simplify the (stripped) AEON boolean string into DNF using the Espresso heuristic
+    minimizer from `pyeda` (much faster than exact minimization in `sympy`). Constant
+    functions, which Espresso does not support, are detected directly from the DNF.
+    """
+    pyeda_friendly = _CONSTANTS_RE.sub(lambda m: '1' if m.group(1) == 'true' else '0', expr_str)
+    dnf = pyeda_expr(pyeda_friendly.replace('!', '~')).to_dnf()
+    if dnf.is_zero():
+        return "false"
+    if dnf.is_one():
+        return "true"
+    minimized, = espresso_exprs(dnf)
+    return _pyeda_to_aeon(minimized)
+
+
+@functools.lru_cache(maxsize=100_000)
 def simplify_expression(expr_str):
     """
     Parse any AEON boolean string, simplify it (e.g., `A | (!A & B)` -> `A | B`),
-    and return the cleaned DNF expression. Simplification is done with `sympy`.
+    and return the cleaned DNF expression, together with a flag whether it differs
+    from the original (ignoring whitespace).
+
+    Results are cached in memory (per worker process) and, if it is open, in the disk
+    cache shared between runs, since the same expressions often recur across the files.
     """
+    clean_str = _simplify_cached(expr_str)
+    # Failed (or empty) simplifications return the original string
+    changed = clean_str is not expr_str and clean_str.replace(" ", "") != expr_str.replace(" ", "")
+    return clean_str, changed
+
+
+def _simplify_cached(expr_str):
+    """Simplify the AEON boolean string, using the disk cache if it is open."""
     if not expr_str.strip():
         return expr_str
+    clean_str = simplify_with_ast(expr_str.strip())
+    if clean_str is not None:
+        return clean_str
+    if _disk_cache is None:
+        return _simplify_uncached(expr_str)
+
+    key = hashlib.sha1(f"{DISK_CACHE_VERSION}:{expr_str.strip()}".encode()).hexdigest()
+    row = _disk_cache.execute("SELECT expression FROM simplified WHERE hash = ?", (key,)).fetchone()
+    if row is not None:
+        return row[0]
+    clean_str = _simplify_uncached(expr_str)
+    if clean_str is not expr_str:  # Failed simplifications are not stored
+        with _disk_cache:
+            _disk_cache.execute("INSERT OR REPLACE INTO simplified VALUES (?, ?)", (key, clean_str))
+    return clean_str
+
+
+def _sympy_to_aeon(expr):
+    """Translate a SymPy boolean expression to AEON format (operands keep the canonical
+    SymPy order, same as in SymPy's printer)."""
+    if isinstance(expr, BooleanTrue):
+        return "true"
+    if isinstance(expr, BooleanFalse):
+        return "false"
+    if isinstance(expr, Symbol):
+        return expr.name
+    if isinstance(expr, Not):
+        operand = expr.args[0]
+        return f"!{_sympy_to_aeon(operand)}" if operand.is_Atom else f"!({_sympy_to_aeon(operand)})"
+    if isinstance(expr, (And, Or)):
+        operator = " & " if isinstance(expr, And) else " | "
+        operands = []
+        for operand in expr.args:
+            operand_str = _sympy_to_aeon(operand)
+            operands.append(f"({operand_str})" if isinstance(operand, (And, Or)) else operand_str)
+        return operator.join(operands)
+    raise ValueError(f"Unsupported SymPy expression `{expr}`")
+
+
+def _replace_application(match):
+    """Replace a function application by its placeholder identifier (creating it if needed)."""
+    name, args = match.groups()
+    application = f"{name}({', '.join(arg.strip() for arg in args.split(','))})"
+    if application not in _application_placeholders:
+        placeholder = f"__application_{len(_application_placeholders)}"
+        _application_placeholders[application] = placeholder
+        _symbol_cache[placeholder] = Symbol(application)
+    return _application_placeholders[application]
+
+
+def _simplify_uncached(expr_str):
+    """
+    Simplify the AEON boolean string with `pyeda`, falling back to `sympy` when it
+    fails. Returns the original string if both fail.
+    """
+    try:
+        return simplify_with_espresso(expr_str.strip())
+    except Exception:
+        pass  # Use sympy instead (e.g., for uninterpreted functions, which pyeda can't parse)
 
     # Convert AEON "not" syntax (!) to SymPy syntax (~)
     sympy_friendly = expr_str.strip().replace('!', '~')
     
     try:
         # Parse expression and convert to DNF
-        expr = parse_expr(sympy_friendly)
+        sympy_friendly = _APPLICATION_RE.sub(_replace_application, sympy_friendly)
+        for name in _VARIABLE_RE.findall(sympy_friendly):
+            if name not in _symbol_cache and name not in ("true", "false"):
+                _symbol_cache[name] = Symbol(name)
+        expr = parse_expr(sympy_friendly, local_dict=_symbol_cache, transformations=(), evaluate=False)
         simplified = simplify_logic(expr, form='dnf', force=True)
         
         # Translate back to AEON format
-        clean_str = str(simplified).replace('~', '!')
-        return clean_str
+        return _sympy_to_aeon(simplified)
     except Exception as e:
         print(f"    [!] Error parsing expression '{expr_str.strip()}': {e}")
         return expr_str # Return original if simplification fails
 
-def process_file_inplace(filepath):
-    """Process AEON file in place, simplifying the update expressions."""
-    print(f"Processing: {os.path.basename(filepath)}...", end="")
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-    
-    modified_lines = []
+def read_update_expressions(filepath):
+    """Return the list of update function expressions in the AEON file."""
+    with open(filepath, 'r') as src:
+        return [match.group(2) for match in map(_UPDATE_RE.match, src) if match]
+
+
+def process_file_inplace(filepath, simplified_expressions, durable=True):
+    """Process AEON file in place, replacing the update expressions with their simplified
+    versions (given as a mapping expression -> (simplified expression, changed flag)).
+    Returns the number of simplified lines.
+
+    The file is processed line by line into a temporary file, which then atomically
+    replaces the original (so the original is never left half-written). If `durable`,
+    the new content is also flushed to disk before the replacement.
+    """
     changes_count = 0
-    for line in lines:
-        # Update function lines start with $
-        stripped = line.strip()
-        if stripped.startswith('$') and ':' in stripped:
-            var_name, expression = stripped.split(':', 1)
-            
-            # Simplify the expression and reconstruct the line
-            new_expression = simplify_expression(expression)
-            new_line = f"{var_name}: {new_expression}\n"
-            
-            # Check if we actually changed anything (ignoring whitespace)
-            if new_line.strip().replace(" ", "") != line.strip().replace(" ", ""):
-                changes_count += 1
-            modified_lines.append(new_line)
-        else:
-            # Keep regulation lines and comments exactly as is
-            modified_lines.append(line)
-    
-    # Write back to the same file (overwrite)
-    with open(filepath, 'w') as f:
-        f.writelines(modified_lines)
-    print(f" Done. ({changes_count} lines optimized)")
+    tmp_file = tempfile.NamedTemporaryFile('w', dir=os.path.dirname(os.path.abspath(filepath)), delete=False)
+    try:
+        with open(filepath, 'r') as src, tmp_file:
+            for line in src:
+                # Update function lines start with $
+                match = _UPDATE_RE.match(line)
+                if not match:
+                    # Keep regulation lines and comments exactly as is
+                    tmp_file.write(line)
+                    continue
+                var_name, expression = match.groups()
+
+                # Reconstruct the line with the simplified expression
+                new_expression, changed = simplified_expressions[expression]
+                tmp_file.write(f"{var_name}: {new_expression}\n")
+                changes_count += changed
+
+            if durable:
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+
+        # Replace the original file (keeping its permissions)
+        shutil.copymode(filepath, tmp_file.name)
+        os.replace(tmp_file.name, filepath)
+    except BaseException:
+        os.remove(tmp_file.name)
+        raise
+    return changes_count
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python run_simplify_all.py <target_dir>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target_dir", help="Directory with .aeon files to simplify (in place)")
+    parser.add_argument("--no-fsync", action="store_true",
+                        help="Do not flush the rewritten files to disk (faster, but not crash-safe)")
+    args = parser.parse_args()
 
-    target_dir = sys.argv[1]
+    target_dir = args.target_dir
     if not os.path.isdir(target_dir):
         print(f"Error: Directory '{target_dir}' does not exist.")
         sys.exit(1)
 
-    # Find all .aeon files
-    search_path = os.path.join(target_dir, "*.aeon")
-    aeon_files = glob.glob(search_path)
+    # Find all .aeon files (in a single scan of the directory), skipping hidden ones like `glob`
+    with os.scandir(target_dir) as entries:
+        aeon_files = [
+            entry.path for entry in entries
+            if entry.name.endswith(".aeon") and not entry.name.startswith(".") and entry.is_file()
+        ]
     if not aeon_files:
         print(f"No .aeon files found in {os.path.abspath(target_dir)}")
         return
     print(f"Found {len(aeon_files)} AEON files in '{target_dir}'. Overwriting in progress...\n")
 
-    # Process each file, changing it in place
+    # Collect the distinct update expressions of all files, so that each is simplified only once
+    expressions = list(dict.fromkeys(
+        expression for filepath in aeon_files for expression in read_update_expressions(filepath)
+    ))
+
+    # Simplify all expressions in parallel, since simplification is CPU-bound (large chunks
+    # keep the communication overhead low). Each worker opens its own connection to the disk cache.
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=open_disk_cache,
+                             initargs=(DISK_CACHE_PATH,)) as executor:
+        simplified_expressions = dict(zip(
+            expressions, executor.map(simplify_expression, expressions, chunksize=64)
+        ))
+
+    # Change each file in place
     for filepath in aeon_files:
-        process_file_inplace(filepath)
+        changes_count = process_file_inplace(filepath, simplified_expressions, durable=not args.no_fsync)
+        print(f"Processing: {os.path.basename(filepath)}... Done. ({changes_count} lines optimized)")
 
     print("\nBatch processing complete.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
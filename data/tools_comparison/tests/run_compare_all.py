@@ -1,88 +1,83 @@
-import subprocess
+import multiprocessing
+import multiprocessing.connection
+import os
 import sys
+import tempfile
+import time
+import traceback
+from collections import defaultdict
+from contextlib import redirect_stdout
 from pathlib import Path
 
+from compare_sketchbook_bonesis import compare
 
-def run_comparisons_for_all_models(models_dir: str, universal_fps: bool = False):
+# Timeout (in seconds) for a single comparison, set to 600 since we only use this for simple models
+COMPARISON_TIMEOUT = 600
+# Number of last traceback lines that are printed when a comparison fails
+TRACEBACK_TAIL_LINES = 20
+
+
+def run_comparisons_for_all_models(models_dir: str, universal_fps: bool = False,
+                                   max_workers: int | None = None):
     """
-    Run compare_sketchbook_bonesis.py for all matching zip-aeon-csv triplets
-    in the directory.
+    Run the comparison from compare_sketchbook_bonesis.py for all matching zip-aeon-csv triplets
+    in the directory. Up to `max_workers` comparisons run in parallel (by default,
+    one per CPU).
     """
     models_path = Path(models_dir)
     if not models_path.exists():
         print(f"Error: Directory {models_dir} does not exist")
         sys.exit(1)
     
-    # Find all .zip files (Sketchbook results)
-    zip_files = sorted(models_path.glob("*.zip"))
-    if not zip_files:
+    # List the directory once, grouping the .zip (Sketchbook results), .aeon and .csv files by name
+    # (hidden files are skipped, like with `glob`)
+    model_groups = defaultdict(dict)
+    with os.scandir(models_path) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext in (".zip", ".aeon", ".csv") and not entry.name.startswith(".") and entry.is_file():
+                model_groups[stem][ext[1:]] = Path(entry.path)
+    zip_models = sorted((stem, files) for stem, files in model_groups.items() if "zip" in files)
+    if not zip_models:
         print(f"No .zip files found in {models_dir}")
         sys.exit(1)
-    print(f"Found {len(zip_files)} Sketchbook result files\n")
+    print(f"Found {len(zip_models)} Sketchbook result files\n")
     
-    # Now run the comparison script for all models in the dir
-    results = []
-    for idx, zip_file in enumerate(zip_files, 1):
-        # Derive corresponding .aeon and .csv filenames
-        base_name = zip_file.stem
-        aeon_file = zip_file.parent / f"{base_name}.aeon"
-        csv_file = zip_file.parent / f"{base_name}.csv"
-
-        if not aeon_file.exists():
-            print(f"[{idx}/{len(zip_files)}] Skipping {zip_file.name} (no matching .aeon)")
+    # Prepare inputs for all models in the dir
+    tasks = []
+    for idx, (base_name, files) in enumerate(zip_models, 1):
+        # Get corresponding .aeon and .csv files
+        zip_file = files["zip"]
+        if "aeon" not in files:
+            print(f"[{idx}/{len(zip_models)}] Skipping {zip_file.name} (no matching .aeon)")
             continue
-        if not csv_file.exists():
-            print(f"[{idx}/{len(zip_files)}] Skipping {zip_file.name} (no matching .csv)")
+        if "csv" not in files:
+            print(f"[{idx}/{len(zip_models)}] Skipping {zip_file.name} (no matching .csv)")
             continue
-        
-        print(f"[{idx}/{len(zip_files)}] Comparing {base_name}")
+        aeon_file, csv_file = files["aeon"], files["csv"]
+        tasks.append((idx, base_name, zip_file, aeon_file, csv_file))
+
+    # Now run the comparisons for all models in parallel, printing the logs once each run finishes
+    tasks_by_idx = {task[0]: task for task in tasks}
+    results = {}
+    comparisons = run_comparisons(
+        [(idx, zip_file, aeon_file, csv_file) for (idx, _, zip_file, aeon_file, csv_file) in tasks],
+        universal_fps,
+        max_workers or os.cpu_count() or 1,
+    )
+    for idx, status, log_lines in comparisons:
+        _, base_name, zip_file, aeon_file, csv_file = tasks_by_idx[idx]
+        print(f"[{idx}/{len(zip_models)}] Comparing {base_name}")
         print(f"  Sketchbook: {zip_file.name}")
         print(f"  Model: {aeon_file.name}")
         print(f"  Data: {csv_file.name}")
-        
-        # Prepare and execute the comparison script
-        cmd = [
-            sys.executable,
-            "compare_sketchbook_bonesis.py",
-            str(zip_file),
-            str(aeon_file),
-            str(csv_file)
-        ]
-        if universal_fps:
-            cmd.append("--universal_fps")
-        
-        try:
-            # Timeout is set to 600 since we only use this for simple models
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-            
-            if result.returncode == 0:
-                print(f"  -> Success")
-                # Extract summary from output
-                if "Results match exactly!" in result.stdout:
-                    results.append((base_name, "MATCH"))
-                elif "Results differ!" in result.stdout:
-                    results.append((base_name, "DIFFER"))
-                else:
-                    results.append((base_name, "UNKNOWN"))
-                # Print the output for logging or debugging
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if line.strip():
-                        print(f"    {line}")
-            else:
-                print(f"  X Failed (exit code {result.returncode})")
-                results.append((base_name, "ERROR"))
-                if result.stderr:
-                    print(f"    stderr: {result.stderr}")
-        except subprocess.TimeoutExpired:
-            print(f"  X Timeout (600s)")
-            results.append((base_name, "TIMEOUT"))
-        except Exception as e:
-            print(f"  X Error: {e}")
-            results.append((base_name, "EXCEPTION"))
-        
+        results[idx] = (base_name, status)
+        for line in log_lines:
+            print(line)
         print()
-    
+    # Keep the summary in the (sorted) order of the models
+    results = [results[idx] for idx in sorted(results)]
+
     # Print the summary of all runs
     print("\n" + "="*80)
     print("SUMMARY")
@@ -98,12 +93,105 @@ def run_comparisons_for_all_models(models_dir: str, universal_fps: bool = False)
         print(f"{status:15} {count}")
 
 
+def run_comparisons(tasks: list[tuple[int, Path, Path, Path]], universal_fps: bool, max_workers: int):
+    """Run the comparison for each task (model index and paths) in its own process, at most
+    `max_workers` at the same time. Yields the index, the status and the lines to log for
+    each finished comparison. Comparisons running longer than the timeout are killed.
+
+    The comparison processes are forked from this one where possible, so the heavy
+    libraries are already imported. Their output is written into temporary files.
+    """
+    pending = list(reversed(tasks))
+    # Running comparisons: (index, process, result connection, output path, deadline)
+    running = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        try:
+            while pending or running:
+                while pending and len(running) < max_workers:
+                    idx, zip_file, aeon_file, csv_file = pending.pop()
+                    output_path = os.path.join(output_dir, f"{idx}.log")
+                    receiver, sender = multiprocessing.Pipe(duplex=False)
+                    process = multiprocessing.Process(
+                        target=_compare_in_process,
+                        args=(sender, zip_file, aeon_file, csv_file, universal_fps, output_path),
+                    )
+                    process.start()
+                    sender.close()
+                    running.append((idx, process, receiver, output_path, time.monotonic() + COMPARISON_TIMEOUT))
+
+                # Wait until a comparison sends its result (or exits), or until the nearest deadline
+                next_deadline = min(deadline for (*_, deadline) in running)
+                ready = multiprocessing.connection.wait(
+                    [receiver for (_, _, receiver, _, _) in running] +
+                    [process.sentinel for (_, process, _, _, _) in running],
+                    timeout=max(0.0, next_deadline - time.monotonic()),
+                )
+                still_running = []
+                for comparison in running:
+                    idx, process, receiver, output_path, deadline = comparison
+                    if receiver in ready or process.sentinel in ready:
+                        status, log_lines = _collect_result(process, receiver, output_path)
+                    elif time.monotonic() >= deadline:
+                        process.kill()
+                        process.join()
+                        status, log_lines = "TIMEOUT", [f"  X Timeout ({COMPARISON_TIMEOUT}s)"]
+                    else:
+                        still_running.append(comparison)
+                        continue
+                    receiver.close()
+                    yield idx, status, log_lines
+                running = still_running
+        finally:
+            # Don't leave any comparisons running (e.g., on interrupt)
+            for (_, process, _, _, _) in running:
+                process.kill()
+                process.join()
+
+
+def _compare_in_process(sender, zip_file: Path, aeon_file: Path, csv_file: Path,
+                        universal_fps: bool, output_path: str):
+    """Run a single comparison (in a separate process), writing its printed output into
+    the file at `output_path`. Sends the status and the error lines to log (if any)."""
+    with open(output_path, 'w') as output, redirect_stdout(output):
+        try:
+            results_match = compare(str(zip_file), str(aeon_file), str(csv_file), universal_fps)
+            result = ("MATCH" if results_match else "DIFFER", [])
+        except Exception as e:
+            # Only keep the last lines of the traceback
+            traceback_lines = traceback.format_exc().splitlines()[-TRACEBACK_TAIL_LINES:]
+            result = ("ERROR", [f"  X Failed ({type(e).__name__}: {e})",
+                                "    traceback: " + "\n".join(traceback_lines)])
+    sender.send(result)
+    sender.close()
+
+
+def _collect_result(process, receiver, output_path: str):
+    """Get the status and the lines to log of a finished comparison process."""
+    try:
+        status, log_lines = receiver.recv()
+    except EOFError:
+        # The process exited without sending the result (e.g., it crashed)
+        process.join()
+        return "ERROR", [f"  X Failed (exit code {process.exitcode})"]
+    process.join()
+    if status == "ERROR":
+        return status, log_lines
+    log_lines = [f"  -> Success"]
+    # Collect the output for logging or debugging
+    with open(output_path, 'r') as output:
+        for line in output:
+            if line.strip():
+                log_lines.append(f"    {line.rstrip()}")
+    return status, log_lines
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("models_dir", help="Directory containing .zip, .aeon, and .csv files")
     parser.add_argument("--universal_fps", help="Enforce that there can't be additional fixed points",
                         action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of models compared in parallel")
     args = parser.parse_args()
 
-    run_comparisons_for_all_models(args.models_dir, args.universal_fps)
\ No newline at end of file
+    run_comparisons_for_all_models(args.models_dir, args.universal_fps, args.workers)
\ No newline at end of file
@@ -1,3 +1,5 @@
+import argparse
+import asyncio
 import subprocess
 import sys
 from pathlib import Path
@@ -8,36 +10,70 @@ BENCH_DIR = Path("data/benchmarks/")
 MODELS = ["celldivb", "eprotein", "nsp4", "etc", "interferon", "nsp9", "macrophage"]
 # MODELS = ["nsp9", "macrophage"]
 
-# Step 1: Compile Rust binaries
-print(">>>>>>>>>> COMPILE RUST BINARIES", flush=True)
-try:
-    subprocess.run(["cargo", "build", "--release", "--bin", "run-inference"], cwd=SOURCE_DIR, check=True)
-    print("Compilation completed successfully.\n", flush=True)
-except subprocess.CalledProcessError as e:
-    print(f"Error during Rust compilation: {e}", file=sys.stderr, flush=True)
-    sys.exit(1)
-
-# Step 2: Run benchmarks
-print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>", flush=True)
-print(">>>>>>>>>> START BENCHMARKS RUN", flush=True)
-print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>\n", flush=True)
-
-for model in MODELS:
-    print("==========================", flush=True)
-    print(f"Model {model}", flush=True)
-    print("==========================\n", flush=True)
-    
+BINARY_PATH = SOURCE_DIR / "target/release/run-inference"
+
+
+async def run_benchmark(model: str, semaphore: asyncio.Semaphore):
+    """Run inference on the sketch of a single model, and print its output once finished.
+    The semaphore bounds how many benchmarks run at the same time.
+    """
     model_dir = BENCH_DIR / model
     aeon_file = model_dir / f"{model}_sketch.aeon"
     # aeon_file = model_dir / f"{model}_sketch_v2.aeon"
 
     if not aeon_file.exists():
         print(f"File not found: {aeon_file}", file=sys.stderr, flush=True)
-        continue
-    
+        return
+
+    async with semaphore:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                str(BINARY_PATH), str(aeon_file), "--input-format", "aeon",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except FileNotFoundError:
+            print(f"Executable not found: {BINARY_PATH}", file=sys.stderr, flush=True)
+            return
+        output, _ = await process.communicate()
+
+    print("==========================", flush=True)
+    print(f"Model {model}", flush=True)
+    print("==========================\n", flush=True)
+    print(output.decode('utf-8', errors='replace'), end="", flush=True)
+    if process.returncode != 0:
+        print(f"Error running inference for {model}: exit code {process.returncode}", file=sys.stderr, flush=True)
+
+
+async def run_benchmarks(max_parallel: int):
+    """Run benchmarks for all models, at most `max_parallel` at the same time."""
+    semaphore = asyncio.Semaphore(max_parallel)
+    await asyncio.gather(*(run_benchmark(model, semaphore) for model in MODELS))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    # Benchmarks run one-by-one by default, as parallel runs can distort the measured times
+    parser.add_argument("--parallel", type=int, default=1,
+                        help="Maximal number of benchmarks running at the same time (default: 1)")
+    args = parser.parse_args()
+
+    # Step 1: Compile Rust binaries
+    print(">>>>>>>>>> COMPILE RUST BINARIES", flush=True)
     try:
-        subprocess.run([str(SOURCE_DIR / "target/release/run-inference"), str(aeon_file), "--input-format", "aeon"], check=True)
-    except FileNotFoundError:
-        print(f"Executable not found: {SOURCE_DIR / 'target/release/run-inference'}", file=sys.stderr, flush=True)
+        subprocess.run(["cargo", "build", "--release", "--bin", "run-inference"], cwd=SOURCE_DIR, check=True)
+        print("Compilation completed successfully.\n", flush=True)
     except subprocess.CalledProcessError as e:
-        print(f"Error running inference for {model}: {e}", file=sys.stderr, flush=True)
+        print(f"Error during Rust compilation: {e}", file=sys.stderr, flush=True)
+        sys.exit(1)
+
+    # Step 2: Run benchmarks
+    print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>", flush=True)
+    print(">>>>>>>>>> START BENCHMARKS RUN", flush=True)
+    print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>\n", flush=True)
+
+    asyncio.run(run_benchmarks(max(1, args.parallel)))
+
+
+if __name__ == "__main__":
+    main()